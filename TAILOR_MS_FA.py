@@ -0,0 +1,49 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) fatty acyl encoding
+#Compact integer representation of fatty acyls (FA) and TG species shared by the TAILOR-MS scripts.
+#A 'CxDB' string (carbon chain length x double bond number) is packed into one small integer C*DB_base + DB, so that sorting the codes sorts by C, then DB.
+#Brutto TGs use the same packing of their total C and DB. A TG structure is keyed by its sorted FA code triple packed into one int64.
+#'CxDB' strings are only parsed once per distinct string, and only produced again when results are written.
+import numpy as np
+import pandas as pd
+
+DB_base = 256 #Double bond numbers must be below DB_base
+Key_base = 2**20 #FA codes must be below Key_base (C below 4096)
+
+def pack(C,DB): #FA (or brutto TG) codes from carbon chain length and double bond numbers
+    return np.asarray(C,dtype='int64')*DB_base + np.asarray(DB,dtype='int64')
+
+def carbon(code):
+    return np.asarray(code) // DB_base
+
+def double_bond(code):
+    return np.asarray(code) % DB_base
+
+def encode(x): #Codes of 'CxDB' strings. Each distinct string is parsed once (lookup table of the distinct strings)
+    x = x.astype(object) if isinstance(x,pd.Series) else pd.Series(x,dtype=object)
+    Codes,Strings = pd.factorize(x)
+    if (Codes < 0).any(): #Missing values would otherwise take the code of another FA
+        raise ValueError('Fatty acyl/TG notation missing in rows: %s' %', '.join(x.index[Codes < 0].astype('str')))
+    CDB = pd.Series(Strings,dtype=object).str.split('x',expand=True).astype('int64')
+    Out_of_range = ((CDB[0] < 0) | (CDB[0]*DB_base >= Key_base) | (CDB[1] < 0) | (CDB[1] >= DB_base)).to_numpy()
+    if Out_of_range.any():
+        raise ValueError('Fatty acyl/TG notation out of range (0 <= C < %d, 0 <= DB < %d): %s' %(Key_base//DB_base,DB_base,', '.join(Strings[Out_of_range])))
+    return pack(CDB[0],CDB[1])[Codes]
+
+def decode(code): #'CxDB' strings of codes. Each distinct code is written once
+    Codes,Unique = pd.factorize(np.asarray(code,dtype='int64'))
+    Strings = (pd.Series(carbon(Unique)).astype('str') + 'x' + pd.Series(double_bond(Unique)).astype('str')).to_numpy(dtype=object)
+    return Strings[Codes]
+
+def structure_key(FA1,FA2,FA3): #Key of a TG structure from its FA codes, sorted so that FA1<=FA2<=FA3
+    FA = np.sort(np.stack([FA1,FA2,FA3],axis=1),axis=1)
+    return (FA[:,0]*Key_base + FA[:,1])*Key_base + FA[:,2]
+
+def structure_FA(key): #Sorted FA codes (FA1, FA2, FA3) of TG structure keys
+    key = np.asarray(key,dtype='int64')
+    return key // Key_base**2,key // Key_base % Key_base,key % Key_base
+
+def triples(n): #Index triples i<=j<=k of n items, in the same order as itertools.combinations_with_replacement(range(n),3)
+    i1,i2 = np.triu_indices(n)
+    n3 = n - i2
+    i1,i2 = np.repeat(i1,n3),np.repeat(i2,n3)
+    return i1,i2,i2 + np.arange(n3.sum()) - np.repeat(np.cumsum(n3)-n3,n3)
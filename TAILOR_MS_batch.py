@@ -0,0 +1,82 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) cohort batch mode
+#Runs the TAILOR-MS Identifier on many sample files (same layout as Input.csv) with a pool of worker processes.
+#The FA list and the TG structure library built from it are computed once, and handed to each worker once when it starts.
+#With a cache directory, the workers share the persistent candidate cache (TAILOR_MS_cache.py).
+#Writes one <sample>_Results.csv per sample and a combined long-format table (Results_all.csv) keyed by sample.
+#CSV files without the input columns (eg FA.csv or earlier result tables) are not samples and are skipped.
+#A sample that fails does not stop the cohort: it is listed with its error in Failed_samples.csv and left out of Results_all.csv.
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import TAILOR_MS_cache as cache
+import TAILOR_MS_engine as engine
+
+Shared = {} #FA list, TG structure library and candidate cache of the worker process, set by init_worker
+
+def init_worker(FA_input,Library,cache_dir=None,cache_size=100000): #Receive the shared candidate tables once per worker process
+    Shared['FA_input'] = FA_input
+    Shared['Library'] = Library
+    Shared['Cache'] = None if cache_dir is None else cache.open_cache(cache_dir,FA_input,cache_size)
+
+Input_columns = ['Name','TG','FA','Peak','RT_left','RT_right','Intensity','Abundance_threshold(%)','RT_tolerance(%)']
+
+def is_sample(path): #A sample file has all columns of Input.csv
+    try:
+        return set(Input_columns) <= set(pd.read_csv(path,nrows=0).columns)
+    except (ValueError,OSError): #Empty or unreadable file, reported as a failed sample
+        return True
+
+def sample_files(pattern): #List the sample files of a directory (all .csv files) or a glob pattern. Returns the sample files and the skipped non-sample files
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern,'*.csv')
+    paths = sorted(glob.glob(pattern))
+    Samples = [x for x in paths if is_sample(x)]
+    return Samples,[x for x in paths if x not in Samples]
+
+def sample_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def identify_sample(path,output_dir): #Identify TG structures of one sample and write its result table
+    rdf = engine.read_input(path)
+    try:
+        engine.check_input(rdf)
+    except SystemExit as e: #Report the sample instead of stopping the worker process
+        raise ValueError('%s: %s' %(path,e))
+    rdf2 = engine.cal_rel_abu(rdf)
+    if Shared['Cache'] is None:
+        rFA_df_SU = engine.library_candidates(rdf2,Shared['Library'],Shared['FA_input'])
+    else:
+        rFA_df_SU = cache.cached_candidates(rdf2,Shared['FA_input'],Shared['Cache'],Shared['Library'])
+    FA_struct = engine.format_results(engine.TG_identification(rdf2,rFA_df_SU))
+    FA_struct.to_csv(os.path.join(output_dir,sample_name(path) + '_Results.csv'))
+    return FA_struct
+
+def try_identify_sample(path,output_dir): #Same as identify_sample, returns (result table, None) or (None, error message) so that one sample cannot stop the cohort
+    try:
+        return identify_sample(path,output_dir),None
+    except Exception as e:
+        return None,'%s: %s' %(type(e).__name__,e)
+
+def run_batch(paths,FA_input,output_dir,workers=None,cache_dir=None,cache_size=100000): #Identify all samples and write per-sample and combined results. workers=1 runs in the current process. Returns the combined results and the failed samples
+    os.makedirs(output_dir,exist_ok=True)
+    Library = engine.FA_library(FA_input)
+    if cache_dir is not None:
+        cache.open_cache(cache_dir,FA_input,cache_size)['db'].close() #Invalidate entries of another FA list before the workers start
+    if workers == 1:
+        init_worker(FA_input,Library,cache_dir,cache_size)
+        Outcomes = [try_identify_sample(x,output_dir) for x in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,initializer=init_worker,initargs=(FA_input,Library,cache_dir,cache_size)) as pool:
+            Outcomes = list(pool.map(try_identify_sample,paths,[output_dir]*len(paths)))
+
+    Failed = pd.DataFrame([(sample_name(y),y,x[1]) for x,y in zip(Outcomes,paths) if x[1] is not None],columns=['Sample','File','Error'])
+    if len(Failed):
+        Failed.to_csv(os.path.join(output_dir,'Failed_samples.csv'),index=False)
+    elif os.path.exists(os.path.join(output_dir,'Failed_samples.csv')): #From an earlier run
+        os.remove(os.path.join(output_dir,'Failed_samples.csv'))
+    Results_all = [x[0].reset_index().assign(Sample=sample_name(y)) for x,y in zip(Outcomes,paths) if x[1] is None]
+    Results_all = pd.concat(Results_all,axis=0,sort=False,ignore_index=True) if len(Results_all) else pd.DataFrame(columns=['No.','Identification/Prediction'] + engine.Result_columns + ['Sample'])
+    Results_all = Results_all[['Sample'] + [x for x in Results_all.columns if x != 'Sample']]
+    Results_all.to_csv(os.path.join(output_dir,'Results_all.csv'),index=False)
+    return Results_all,Failed
@@ -0,0 +1,77 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) candidate cache
+#Persistent on-disk cache (SQLite) of the candidate TG structures of Step2 (Three_FA, FA list filter, FA order and removal of redundant TGs).
+#The candidates of a brutto TG only depend on the TG, the set of FAs detected for it and the FA list, so they are stored under a hash of these three.
+#Entries made with another FA list are removed when the cache is opened, and the least recently used entries are removed above the size limit.
+#A cache hit costs a hash per TG and a SQLite lookup, about as much as Three_FA for TGs with few detected FAs. The cache pays off when enumeration is expensive:
+#many detected FAs per TG, or the FA library candidates of batch mode (library_candidates) with a large FA list.
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+import TAILOR_MS_engine as engine
+import TAILOR_MS_FA as FA_codes
+
+Cache_format = 2 #Structure keys stored as 8-byte integers. Entries of other formats are invalidated like those of another FA list
+
+def FA_list_hash(FA_input): #Content hash of the FA list (the order of FAs in FA.csv does not change the candidates) and of the cache format
+    return hashlib.sha1(('%d|' %Cache_format + ','.join(engine.FA_list_codes(FA_input).astype('str'))).encode()).hexdigest()
+
+def open_cache(cache_dir,FA_input,max_entries=100000): #Open (or create) the cache of the given FA list under cache_dir
+    os.makedirs(cache_dir,exist_ok=True)
+    db = sqlite3.connect(os.path.join(cache_dir,'TAILOR-MS_candidates.sqlite'),timeout=60) #Batch workers share the cache file
+    db.execute('CREATE TABLE IF NOT EXISTS candidates (key TEXT PRIMARY KEY, library TEXT, structures BLOB, last_used REAL)')
+    db.execute('CREATE INDEX IF NOT EXISTS candidates_last_used ON candidates (last_used)')
+    Cache = {'db':db,'library':FA_list_hash(FA_input),'max_entries':max_entries}
+    with db:
+        db.execute('DELETE FROM candidates WHERE library != ?',(Cache['library'],)) #FA list (or cache format) changed, invalidate
+    return Cache
+
+def cache_keys(rdf2,library): #Brutto TG codes (sorted) and one key per TG: hash of the TG, its detected FA set and the FA list
+    TG_FA = np.unique(rdf2['TG_code'].to_numpy(dtype='int64')*FA_codes.Key_base + rdf2['FA_code'].to_numpy(dtype='int64')) #Sorted by TG, then FA
+    TG,start = np.unique(TG_FA // FA_codes.Key_base,return_index=True)
+    Codes = TG_FA.tobytes() #The TG and FA codes of each TG are one slice of 8-byte integers
+    Bounds = (8*np.append(start,len(TG_FA))).tolist()
+    library = library.encode()
+    return TG,[hashlib.sha1(library + Codes[x:y]).hexdigest() for x,y in zip(Bounds[:-1],Bounds[1:])]
+
+def structure_blobs(rFA_df_SU): #Structure keys of each TG as one blob of 8-byte integers
+    TG = rFA_df_SU['TG'].to_numpy()
+    Order = np.argsort(TG,kind='stable')
+    TG_sorted,start = np.unique(TG[Order],return_index=True)
+    return dict(zip(TG_sorted.tolist(),[x.tobytes() for x in np.split(rFA_df_SU.index.to_numpy(dtype='int64')[Order],start[1:])]))
+
+def chunks(Keys,n=500): #Stay below the SQLite parameter limit
+    for x in range(0,len(Keys),n):
+        yield Keys[x:x+n],','.join('?'*len(Keys[x:x+n]))
+
+def cached_candidates(rdf2,FA_input,Cache,Library=None,Counters=None): #Candidate TG structures (same table as Three_FA), enumerated only for TGs that are not in the cache
+    db = Cache['db']
+    TG,Keys = cache_keys(rdf2,Cache['library'])
+    Stored = {}
+    for x,y in chunks(Keys):
+        Stored.update(db.execute('SELECT key, structures FROM candidates WHERE key IN (%s)' %y,x).fetchall())
+    Used = list(Stored)
+    Miss = [(x,y) for x,y in zip(TG.tolist(),Keys) if y not in Stored]
+    if Counters is not None:
+        engine.add_counts(Counters,cache_hits=len(Used),cache_misses=len(Miss))
+    if len(Miss):
+        rdf2_miss = rdf2.loc[rdf2['TG_code'].isin([x for x,y in Miss])]
+        New = engine.Three_FA(rdf2_miss,FA_input,Counters) if Library is None else engine.library_candidates(rdf2_miss,Library,FA_input)
+        New = structure_blobs(New)
+        Stored.update((y,New.get(x,b'')) for x,y in Miss) #TGs without candidates are stored as well
+
+    now = time.time()
+    with db:
+        for x,y in chunks(Used):
+            db.execute('UPDATE candidates SET last_used = ? WHERE key IN (%s)' %y,[now] + x)
+        if len(Miss):
+            db.executemany('INSERT OR REPLACE INTO candidates VALUES (?,?,?,?)',[(y,Cache['library'],Stored[y],now) for x,y in Miss])
+            n = db.execute('SELECT COUNT(*) FROM candidates').fetchone()[0]
+            if n > Cache['max_entries']: #Remove the least recently used entries
+                db.execute('DELETE FROM candidates WHERE key IN (SELECT key FROM candidates ORDER BY last_used LIMIT ?)',(n-Cache['max_entries'],))
+
+    Blobs = [Stored[x] for x in Keys]
+    Structures = np.frombuffer(b''.join(Blobs),dtype='int64')
+    return engine.candidate_table(np.repeat(TG,[len(x)//8 for x in Blobs]),*FA_codes.structure_FA(Structures))
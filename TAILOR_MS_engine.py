@@ -0,0 +1,215 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) engine
+#Array based implementation of the TAILOR-MS Identifier steps. NL peaks are encoded as NumPy arrays (RT_left, RT_right, intensity, relative abundance and thresholds),
+#and overlap, minimum-abundance FA selection, repetition correction and the threshold test are evaluated for all TG structures at once.
+#The identification outcome is identical to the original per-structure pandas loops.
+#FAs, brutto TGs and TG structures are carried as integer codes (TAILOR_MS_FA.py) and only written as 'CxDB' strings in the result table.
+import sys
+import numpy as np
+import pandas as pd
+import TAILOR_MS_FA as FA_codes
+
+Result_columns = ['Brutto Level','TG Structure','Constructed Peaks','ID Peak','Name','Retention Time','% Relative Abundance','% Relative Abundance (corrected)','Intensity','Intensity (corrected)']
+
+def read_input(path): #Read input data file and calculate retention time ranges
+    rdf = pd.read_csv(path,delimiter=',',header=0)
+    rdf['Time_dif'] = rdf['RT_right'] - rdf['RT_left']
+    return rdf
+
+def check_input(rdf): #Ensure non-negative values from input data. Also RT_right-RT_left (Time_dif) must > 0. If conditions not met, exit the program and throw an error message
+    Test_neg_0 = not ((rdf['RT_left'] <0).any() or (rdf['RT_right'] <=0).any() or (rdf['Time_dif'] <=0).any() or (rdf['Intensity'] <=0).any()
+                      or (rdf['Abundance_threshold(%)'] <0).any() or (rdf['RT_tolerance(%)'] <=0).any())
+    if Test_neg_0 == False:
+        sys.exit('Error: Negative and/or 0 values are present in input dataset. Check values in RT_left, RT_right, Time_dif, Area, Abundance_threshold(%) and RT_tolerance(%) columns.')
+    Missing = rdf['TG'].isna() | rdf['FA'].isna() #Rows without TG would be dropped by the grouping by TG
+    if Missing.any():
+        sys.exit('Error: Missing TG and/or FA values in input dataset, rows: ' + ', '.join(rdf.index[Missing].astype('str')))
+
+#Step1, calculate relative abundances vs ID peak (ie peak with the largest area reading of the TGs with the same carbon number and double bonds(FAs not considered))
+def cal_rel_abu(rdf):
+    TG_order = np.argsort(pd.factorize(rdf['TG'])[0],kind='stable') #Group rows by TG, in order of first appearance, keeping the original row order within each TG
+    rdf2 = rdf.iloc[TG_order].copy() #The input row numbers are kept until the TG and FA notations are encoded, so that errors point to the input rows
+    Area_max = rdf2.groupby('TG',sort=False)['Intensity'].transform('max')
+    rdf2['Rel_abundance(%)'] = (rdf2['Intensity'].div(Area_max)*100).round(2) #Calculate relative abundance (to the maximum peak)
+    rdf2 = rdf2.loc[rdf2['Rel_abundance(%)']>0] #Remove area 0, which could have both RT left and RT right equivalent to 0, a situation that creates problems for overlap match.
+    rdf2['TG_code'] = FA_codes.encode(rdf2['TG'])
+    rdf2['FA_code'] = FA_codes.encode(rdf2['FA'])
+    return rdf2.reset_index(drop=True)
+
+#Step2, create all possible combinations for each TG, using the detected FA neutral losses
+def FA_list_codes(FA_input): #Codes of the input FA list
+    return np.unique(FA_codes.encode(FA_input.iloc[:,0]))
+
+def candidate_table(TG,FA1,FA2,FA3): #TG structure table (index TG_structure key, columns TG, FA1, FA2, FA3 as codes with FA1<=FA2<=FA3). Redundant TG structures are removed
+    Key = FA_codes.structure_key(FA1,FA2,FA3)
+    FA1,FA2,FA3 = FA_codes.structure_FA(Key)
+    rFA_df_SU = pd.DataFrame({'TG':np.asarray(TG,dtype='int64'),'FA1':FA1,'FA2':FA2,'FA3':FA3},index=pd.Index(Key,name='TG_structure'))
+    return rFA_df_SU.loc[~rFA_df_SU.index.duplicated()]
+
+def add_counts(Counters,**counts): #Add pipeline counts to the counters of a run report (see TAILOR_MS_report.py)
+    for x,y in counts.items():
+        Counters[x] = Counters.get(x,0) + int(y)
+
+def Three_FA(rdf2,FA_input,Counters=None): #Returns the unique TG structures with FAs sorted by carbon chain length and double bond number (see candidate_table)
+    TG_FA = rdf2[['TG_code','FA_code']].drop_duplicates()
+    TG_code,FA_code = TG_FA['TG_code'].to_numpy(),TG_FA['FA_code'].to_numpy()
+    #All FA1<=FA2 pairs within each TG (combinations with replacement of the detected FAs)
+    TG_group = pd.factorize(TG_code)[0] #TG_FA rows are grouped by TG (see cal_rel_abu)
+    n_pair = np.searchsorted(TG_group,TG_group,side='right') - np.arange(len(TG_group))
+    i1 = np.repeat(np.arange(len(TG_group)),n_pair)
+    i2 = i1 + np.arange(n_pair.sum()) - np.repeat(np.cumsum(n_pair)-n_pair,n_pair)
+    TG,FA1,FA2 = TG_code[i1],FA_code[i1],FA_code[i2]
+
+    FA3_C = FA_codes.carbon(TG) - FA_codes.carbon(FA1) - FA_codes.carbon(FA2)
+    FA3_DB = FA_codes.double_bond(TG) - FA_codes.double_bond(FA1) - FA_codes.double_bond(FA2)
+    Valid = (FA3_C>=0) & (FA3_DB>=0)
+    FA3 = FA_codes.pack(FA3_C,FA3_DB)
+    keep = Valid & np.isin(FA3,FA_list_codes(FA_input)) #Remove the third FAs that cannot be found in input FA list.(There are still redundant FA1,FA2 and FA3 combinations).
+    rFA_df_SU = candidate_table(TG[keep],FA1[keep],FA2[keep],FA3[keep]) #Fix the order of FA1, FA2 and FA3 and remove redundant TGs
+    if Counters is not None:
+        add_counts(Counters,FA_pairs=len(TG),third_FA_negative=(~Valid).sum(),third_FA_not_in_FA_list=(Valid & ~keep).sum(),
+                   redundant_structures=keep.sum()-len(rFA_df_SU),candidate_structures=len(rFA_df_SU))
+    return rFA_df_SU
+
+def FA_library(FA_input): #Enumerate all TG structures that can be built from the input FA list (FA1<=FA2<=FA3). It does not depend on the input data, so it is computed once and shared by all samples of a batch
+    FA = FA_list_codes(FA_input) #Sorted according to carbon chain length and double bond numbers
+    i1,i2,i3 = FA_codes.triples(len(FA))
+    TG = FA_codes.pack(FA_codes.carbon(FA[i1]) + FA_codes.carbon(FA[i2]) + FA_codes.carbon(FA[i3]),FA_codes.double_bond(FA[i1]) + FA_codes.double_bond(FA[i2]) + FA_codes.double_bond(FA[i3]))
+    return candidate_table(TG,FA[i1],FA[i2],FA[i3])
+
+def library_candidates(rdf2,Library,FA_input): #Same TG structures as Three_FA, taken from the precomputed FA library: a structure is a candidate if at least two of its FA positions are detected for the TG
+    if not np.isin(rdf2['FA_code'],FA_list_codes(FA_input)).all():
+        return Three_FA(rdf2,FA_input) #FAs outside of the input FA list were detected, which the library cannot cover
+    TG_FA = np.unique(rdf2['TG_code'].to_numpy()*FA_codes.Key_base + rdf2['FA_code'].to_numpy())
+    Library = Library.loc[np.isin(Library['TG'],rdf2['TG_code'])]
+    Detected = sum(np.isin(Library['TG'].to_numpy()*FA_codes.Key_base + Library[x].to_numpy(),TG_FA).astype('int64') for x in ['FA1','FA2','FA3'])
+    return Library.loc[Detected>=2]
+
+#Step3, determine overlap of FA1, FA2 and FA3 NL peaks and apply abundance and RT thresholds
+def encode_peaks(rdf2): #Encode NL peaks as arrays. A mock FA is appended as the last peak, to be used when only two FAs are used to determine TG structure
+    RT_max = rdf2['RT_right'].max()+1
+    Peaks = {'RT_left':np.append(rdf2['RT_left'].to_numpy(dtype='float64'),0),
+             'RT_right':np.append(rdf2['RT_right'].to_numpy(dtype='float64'),RT_max),
+             'RT_left_input':np.append(rdf2['RT_left'].to_numpy(),0), #RTs with the input column types for the result table (integer RTs are written without decimals)
+             'RT_right_input':np.append(rdf2['RT_right'].to_numpy(),0),
+             'Time_dif':np.append(rdf2['Time_dif'].to_numpy(dtype='float64'),RT_max),
+             'Intensity':np.append(rdf2['Intensity'].to_numpy(),0),
+             'Rel_abundance(%)':np.append(rdf2['Rel_abundance(%)'].to_numpy(dtype='float64'),101), #!!!(abundance and RT threshold) Mock FA is never the FA with least abundance
+             'Abundance_threshold(%)':np.append(rdf2['Abundance_threshold(%)'].to_numpy(dtype='float64'),0),
+             'RT_tolerance(%)':np.append(rdf2['RT_tolerance(%)'].to_numpy(dtype='float64'),0),
+             'Peak':np.append(rdf2['Peak'].to_numpy(dtype=object),'#').astype(object),
+             'Name':np.append(rdf2['Name'].to_numpy(dtype=object),'#').astype(object),
+             'FA_code':np.append(rdf2['FA_code'].to_numpy(),-1)}
+    Trace_key = rdf2['TG_code'].to_numpy()*FA_codes.Key_base + rdf2['FA_code'].to_numpy() #One key per (TG, FA) NL trace
+    Peaks['Trace_key'],Trace = np.unique(Trace_key,return_inverse=True)
+    Peaks['Trace'] = np.append(Trace.ravel(),len(Peaks['Trace_key'])) #The mock FA forms the last trace
+    return interval_index(Peaks)
+
+def interval_index(Peaks): #Index the NL peaks of every trace by retention time, so that only peaks with overlapping RT windows are listed
+    #Retention times are replaced by their ranks, so that each (trace, RT) pair is an exact integer key
+    Peaks['RT_rank'] = np.unique(np.r_[Peaks['RT_left'],Peaks['RT_right']])
+    Peaks['Rank_left'] = np.searchsorted(Peaks['RT_rank'],Peaks['RT_left'])
+    Peaks['Rank_right'] = np.searchsorted(Peaks['RT_rank'],Peaks['RT_right'])
+    Trace_base = Peaks['Trace'].astype('int64')*len(Peaks['RT_rank'])
+    order = np.lexsort((Peaks['Rank_left'],Peaks['Trace'])) #Peaks sorted by trace, then by RT_left
+    Peaks['Index_peaks'] = order
+    Peaks['Index_left'] = (Trace_base + Peaks['Rank_left'])[order]
+    Peaks['Index_right'] = np.maximum.accumulate((Trace_base + Peaks['Rank_right'])[order]) #Running maximum of RT_right within each trace (trace keys only increase)
+    return Peaks
+
+def find_traces(Peaks,TG,FA): #Locate the NL trace of each (TG, FA) pair (codes). Undetected FAs point to the mock FA trace
+    key = np.asarray(TG,dtype='int64')*FA_codes.Key_base + np.asarray(FA,dtype='int64')
+    pos = np.minimum(np.searchsorted(Peaks['Trace_key'],key),len(Peaks['Trace_key'])-1)
+    return np.where(Peaks['Trace_key'][pos]==key,pos,len(Peaks['Trace_key']))
+
+def overlapping_peaks(Peaks,trace,left,right): #For each query RT window (as ranks), list the peaks of the given trace whose RT window intersects it. Returns (query, peak) pairs
+    base = trace.astype('int64')*len(Peaks['RT_rank'])
+    lo = np.searchsorted(Peaks['Index_right'],base+left,side='left') #Peaks before lo end before the window starts
+    hi = np.searchsorted(Peaks['Index_left'],base+right,side='right') #Peaks from hi onwards start after the window ends
+    n = np.maximum(hi-lo,0)
+    query = np.repeat(np.arange(len(trace)),n)
+    peak = Peaks['Index_peaks'][np.repeat(lo,n) + np.arange(n.sum()) - np.repeat(np.cumsum(n)-n,n)]
+    keep = Peaks['Rank_right'][peak] >= left[query] #Nested peaks within a trace may still end before the window starts
+    return query[keep],peak[keep]
+
+def peak_combinations(Peaks,rFA_df_SU): #List the FA1, FA2 and FA3 NLs with different RTs (ie a, b, c etc. peaks) of every TG structure that overlap, together with their overlapped time segment
+    trace = [find_traces(Peaks,rFA_df_SU['TG'],rFA_df_SU[x]) for x in ['FA1','FA2','FA3']]
+    struct,p1 = overlapping_peaks(Peaks,trace[0],np.zeros(len(rFA_df_SU),dtype='int64'),np.full(len(rFA_df_SU),len(Peaks['RT_rank'])-1)) #All FA1 peaks
+    q,p2 = overlapping_peaks(Peaks,trace[1][struct],Peaks['Rank_left'][p1],Peaks['Rank_right'][p1])
+    struct,p1 = struct[q],p1[q]
+    left = np.maximum(Peaks['Rank_left'][p1],Peaks['Rank_left'][p2])
+    right = np.minimum(Peaks['Rank_right'][p1],Peaks['Rank_right'][p2])
+    q,p3 = overlapping_peaks(Peaks,trace[2][struct],left,right)
+    struct,p1,p2 = struct[q],p1[q],p2[q]
+    left = np.maximum(left[q],Peaks['Rank_left'][p3])
+    right = np.minimum(right[q],Peaks['Rank_right'][p3])
+    order = np.lexsort((p3,p2,p1,struct)) #Same order as the FA1 x FA2 x FA3 combination list (peaks of a trace are numbered in input order)
+    return struct[order],np.stack([p1,p2,p3],axis=1)[order],Peaks['RT_rank'][left[order]],Peaks['RT_rank'][right[order]]
+
+def overlap_table(rdf2,rFA_df_SU): #Overlapping peak combinations of all TG structures with the FA of least abundance, its relative abundance and the overlap as % of its RT range. Independent of the thresholds
+    Peaks = encode_peaks(rdf2)
+    struct,comb,RT_left,RT_right = peak_combinations(Peaks,rFA_df_SU) #RT coverage (left and right) for the overlapped time segment
+
+    #Find the FA with least abundance of the three and the repetitive minimum FAs for the particular structural combination (used for correction)
+    Min_FA = comb[np.arange(len(comb)),Peaks['Rel_abundance(%)'][comb].argmin(axis=1)]
+    Is_min_FA = Peaks['FA_code'][comb] == Peaks['FA_code'][Min_FA][:,None]
+    Comb = {'struct':struct,'comb':comb,'Min_FA':Min_FA,'Is_min_FA':Is_min_FA,'Repetition':Is_min_FA.sum(axis=1),
+            'Overlap(%)':(RT_right-RT_left)/Peaks['Time_dif'][Min_FA]*100,
+            'Rel_abundance(%)':Peaks['Rel_abundance(%)'][Min_FA]}
+    return Peaks,Comb
+
+def select_combinations(Comb,keep): #Subset of the overlap table
+    return {x:y[keep] for x,y in Comb.items()}
+
+def TG_identification(rdf2,rFA_df_SU,Counters=None): #Find the FA with least abundance of the overlapping peak combinations and apply abundance and overlap thresholds
+    Peaks,Comb = overlap_table(rdf2,rFA_df_SU)
+    return apply_thresholds(Peaks,rFA_df_SU,Comb,Counters)
+
+def apply_thresholds(Peaks,rFA_df_SU,Comb,Counters=None): #Compare the overlap to the FA with least abundance and see if it passes the RT tolerance and relative abundance threshold
+    Passed_RT = Comb['Overlap(%)'] > Peaks['RT_tolerance(%)'][Comb['Min_FA']]
+    Passed_abundance = Comb['Rel_abundance(%)'] > Peaks['Abundance_threshold(%)'][Comb['Min_FA']]
+    if Counters is not None:
+        add_counts(Counters,overlapping_triples=len(Passed_RT),failed_RT_tolerance=(~Passed_RT).sum(),failed_abundance_threshold=(~Passed_abundance).sum(),
+                   failed_both_thresholds=(~Passed_RT & ~Passed_abundance).sum(),passed_thresholds=(Passed_RT & Passed_abundance).sum())
+    return structural_outcome(Peaks,rFA_df_SU,select_combinations(Comb,Passed_RT & Passed_abundance))
+
+def structural_outcome(Peaks,rFA_df_SU,Comb): #Write the peak combinations into the result table. The FA codes of the structure are kept for sorting
+    struct,comb,Min_FA,Repetition = Comb['struct'],Comb['comb'],Comb['Min_FA'],Comb['Repetition']
+    Peak = Peaks['Peak'][comb]
+    Peak = np.where(Comb['Is_min_FA'],np.array([x.capitalize() for x in Peak.ravel()],dtype=object).reshape(Peak.shape),Peak) #Capitalize the FA(s) that has minimum concentration and is thus used to test relative abundance and overlap
+    Structure = rFA_df_SU.iloc[struct]
+    Brutto = 'TG(' + FA_codes.decode(Structure['TG']) + ')'
+    Rel_abundance = Peaks['Rel_abundance(%)'][Min_FA]
+    Intensity = Peaks['Intensity'][Min_FA]
+    FA_struct = pd.DataFrame({'Brutto Level':Brutto,
+                              'TG Structure':'TG(' + FA_codes.decode(Structure['FA1']) + '_' + FA_codes.decode(Structure['FA2']) + '_' + FA_codes.decode(Structure['FA3']) + ')',
+                              'Constructed Peaks':Peak[:,0] + Peak[:,1] + Peak[:,2],
+                              'ID Peak':Brutto + '_' + FA_codes.decode(Peaks['FA_code'][Min_FA]) + '_' + np.array([x.lower() for x in Peaks['Peak'][Min_FA]],dtype=object),
+                              'Name':Peaks['Name'][Min_FA],
+                              'Retention Time':np.array([str(x) + '-' + str(y) for x,y in zip(np.round(Peaks['RT_left_input'][Min_FA],2).tolist(),np.round(Peaks['RT_right_input'][Min_FA],2).tolist())],dtype=object),
+                              '% Relative Abundance':np.round(Rel_abundance,2),
+                              '% Relative Abundance (corrected)':np.round(Rel_abundance/Repetition,2),
+                              'Intensity':Intensity,
+                              'Intensity (corrected)':Intensity/Repetition,
+                              'TG_code':Structure['TG'].to_numpy(),'FA1_code':Structure['FA1'].to_numpy(),'FA2_code':Structure['FA2'].to_numpy(),'FA3_code':Structure['FA3'].to_numpy()},
+                             columns=Result_columns + ['TG_code','FA1_code','FA2_code','FA3_code'])
+    return FA_struct.dropna() #The index keeps the position of each row in Comb
+
+def format_results(FA_struct): #Label and sort the identified TG species for output
+    return number_results(sort_results(FA_struct))
+
+def sort_results(FA_struct): #Label TG species and sort them by brutto level and FA carbon chain length and double bond numbers. The index of FA_struct is kept
+    if FA_struct.empty: #No TG species identified
+        return pd.DataFrame(columns=['Identification/Prediction'] + Result_columns)
+    Ident_Pred = FA_struct['Constructed Peaks'].str.contains('#',regex=False).map({True:'P',False:'I'}) #Label TG species based on 2 (prediction) or 3 (identification) FAs
+    FA_struct = pd.concat([Ident_Pred.rename('Identification/Prediction'),FA_struct],axis=1)
+
+    #Sort by brutto level (as written in the output), then by the FA codes of the structure, which sort by carbon chain length and double bond numbers
+    TG,TG_inverse = np.unique(FA_struct['TG_code'].to_numpy(),return_inverse=True)
+    Brutto_rank = np.argsort(np.argsort('TG(' + FA_codes.decode(TG) + ')',kind='stable'))[TG_inverse.ravel()]
+    return FA_struct.iloc[np.lexsort((FA_struct['FA3_code'],FA_struct['FA2_code'],FA_struct['FA1_code'],Brutto_rank)),0:11]
+
+def number_results(FA_struct): #Number the sorted TG species and write C:DB notation
+    FA_struct = FA_struct.set_index(pd.RangeIndex(1,len(FA_struct.index)+1,name='No.'))
+    for x in ['Brutto Level','TG Structure','ID Peak']:
+        FA_struct[x] = FA_struct[x].str.replace('x',':',regex=False)
+    return FA_struct
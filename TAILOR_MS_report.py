@@ -0,0 +1,115 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) run report
+#Instrumentation of an Identifier run, written as a JSON file next to the result table (<results>_report.json):
+#wall-clock time and memory of every pipeline stage, row and prune counts of every stage, and the brutto TGs with the most work.
+#The memory of a stage is the increase of the process peak resident set size during the stage (0 when the stage stays below an earlier peak). Peak Python allocations per stage (tracemalloc) are optional, as tracing slows down the run.
+#TGs are identified together, so they are ranked by the number of peak triples examined. Only when every TG is identified on its own (streaming mode with --chunksize 1) are they ranked by their measured time.
+#Optionally the whole run is profiled with cProfile (<results>_profile.pstats).
+#Without a run report (Run is None) the stages run as they are and nothing is counted or traced.
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import TAILOR_MS_FA as FA_codes
+try:
+    import resource
+except ImportError: #Not available on Windows, the resident set size is then not reported
+    resource = None
+
+def max_rss_MB(): #High-water mark of the resident set size of the process
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/(2**20 if sys.platform == 'darwin' else 2**10) #Bytes on macOS, kB elsewhere
+
+def start_report(profile=False,trace_memory=False): #Start a run report: stage times and memory, counters, per-TG work and the profiler
+    Run = {'start':time.perf_counter(),'stages':{},'counters':{},'TGs':[],'profiler':None,'trace_memory':trace_memory}
+    if trace_memory:
+        tracemalloc.start()
+    if profile:
+        Run['profiler'] = cProfile.Profile()
+        Run['profiler'].enable()
+    return Run
+
+def stage(Run,name): #Context manager timing one pipeline stage. Stages that run several times (streaming mode) are added up
+    return contextlib.nullcontext() if Run is None else timed_stage(Run,name)
+
+@contextlib.contextmanager
+def timed_stage(Run,name):
+    if Run['trace_memory']:
+        tracemalloc.reset_peak()
+    rss0 = max_rss_MB()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        Stage = Run['stages'].setdefault(name,{'stage':name,'calls':0,'seconds':0.0,'max_rss_increase_MB':None if rss0 is None else 0.0})
+        Stage['calls'] += 1
+        Stage['seconds'] += seconds
+        if rss0 is not None:
+            Stage['max_rss_increase_MB'] += max_rss_MB() - rss0 #Added up over the calls of the stage
+        if Run['trace_memory']:
+            Stage['peak_traced_MB'] = max(Stage.get('peak_traced_MB',0.0),tracemalloc.get_traced_memory()[1]/2**20)
+
+def counters(Run): #Counters of the run report, to be passed to the engine (None without a run report)
+    return None if Run is None else Run['counters']
+
+def count(Run,**counts):
+    if Run is not None:
+        for x,y in counts.items():
+            Run['counters'][x] = Run['counters'].get(x,0) + int(y)
+
+def TG_work(Run,rdf2,rFA_df_SU,FA_struct,seconds=None): #Rows, candidate structures, peak triples (every FA1 x FA2 x FA3 peak combination) and result rows of each brutto TG
+    if Run is None:
+        return
+    Trace = rdf2.groupby(['TG_code','FA_code']).size() #Peaks per NL trace
+    n = [Trace.reindex(pd.MultiIndex.from_arrays([rFA_df_SU['TG'],rFA_df_SU[x]])).fillna(1).to_numpy(dtype='int64') for x in ['FA1','FA2','FA3']] #Undetected FAs use the mock FA (one peak)
+    Work = pd.DataFrame({'rows':rdf2.groupby('TG_code').size()})
+    Work['structures'] = rFA_df_SU.groupby('TG').size()
+    Work['peak_triples'] = pd.Series(n[0]*n[1]*n[2]).groupby(rFA_df_SU['TG'].to_numpy()).sum()
+    Work['results'] = FA_struct.groupby('TG_code').size() if len(FA_struct) else 0
+    Work = Work.fillna(0).astype('int64')
+    if seconds is not None:
+        Work['seconds'] = seconds
+    Work.insert(0,'TG','TG(' + pd.Series(FA_codes.decode(Work.index),index=Work.index).str.replace('x',':',regex=False) + ')') #C:DB notation as in the result table
+    Run['TGs'].append(Work)
+
+def report_paths(results_path): #Run report and profile files next to the result table
+    stem = os.path.splitext(results_path)[0]
+    return stem + '_report.json',stem + '_profile.pstats'
+
+def write_report(Run,results_path,top=20): #Stop tracing and write the run report (and profile). Returns the report
+    if Run['profiler'] is not None:
+        Run['profiler'].disable()
+    total = time.perf_counter() - Run['start']
+    if Run['trace_memory']:
+        tracemalloc.stop()
+    report_path,profile_path = report_paths(results_path)
+
+    Counters = dict(Run['counters'])
+    TGs = pd.concat(Run['TGs']) if len(Run['TGs']) else pd.DataFrame(columns=['TG','rows','structures','peak_triples','results'])
+    if len(TGs):
+        Counters['peak_triples'] = int(TGs['peak_triples'].sum())
+        if 'overlapping_triples' in Counters:
+            Counters['triples_failing_overlap'] = Counters['peak_triples'] - Counters['overlapping_triples']
+    if 'seconds' in TGs and TGs['seconds'].isna().any(): #Some TGs were identified together with others
+        TGs = TGs.drop(columns='seconds')
+    ranked_by = 'seconds' if 'seconds' in TGs else 'peak_triples'
+    TGs = TGs.sort_values(ranked_by,ascending=False,kind='stable').head(top)
+
+    Report = {'results':results_path,'created':time.strftime('%Y-%m-%d %H:%M:%S'),
+              'environment':{'python':platform.python_version(),'numpy':np.__version__,'pandas':pd.__version__,'platform':platform.platform()},
+              'total_seconds':total,'max_rss_MB':max_rss_MB(),
+              'stages':list(Run['stages'].values()),'counters':Counters,
+              'slowest_TGs':{'ranked_by':ranked_by,'TGs':json.loads(TGs.to_json(orient='records'))}}
+    if Run['profiler'] is not None:
+        Run['profiler'].dump_stats(profile_path)
+        Report['profile'] = profile_path
+    with open(report_path,'w') as f:
+        json.dump(Report,f,indent=1)
+    return Report
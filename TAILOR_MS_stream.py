@@ -0,0 +1,97 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) streaming mode
+#Bounded-memory identification of large input data files (eg vendor exports that merge many samples).
+#The input is read in chunks and its rows are partitioned to disk by brutto TG in one pass. Consecutive TG groups (in brutto order) are then joined into batches
+#of about chunksize rows, each batch is identified in one call and the results are appended to the output file.
+#Peak memory depends on the chunk size and the largest TG group, not on the file size.
+#All identification steps only use the rows of one brutto TG, so the output is identical to the standard run.
+#The partitions hold the chunk rows as pickled data frames. They are given the column types of the whole file once read back (eg Intensity is float in every TG group if any value is), as the standard run reads them.
+import os
+import pickle
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import TAILOR_MS_cache as cache
+import TAILOR_MS_engine as engine
+import TAILOR_MS_report as report
+
+def merge_dtype(a,b): #Column type of the whole file from the types of two chunks: numbers are widened (eg int to float), text wins over numbers
+    if a is None or a == b:
+        return b
+    Numeric = [pd.api.types.is_numeric_dtype(x) and not pd.api.types.is_bool_dtype(x) for x in [a,b]]
+    if all(Numeric):
+        return np.result_type(a,b)
+    if not any(Numeric):
+        return np.dtype(object)
+    return b if Numeric[0] else a
+
+def partition_input(path,tmp_dir,chunksize=100000): #Read the input data file in chunks, check the values and append the rows of each brutto TG to its own partition file. Returns the partition files, their row counts and the column types of the whole file
+    Partitions = {} #Brutto TG -> partition file, in order of first appearance
+    Sizes = {}
+    Dtypes = {}
+    for chunk in pd.read_csv(path,delimiter=',',header=0,chunksize=chunksize):
+        engine.check_input(chunk.assign(Time_dif=chunk['RT_right'] - chunk['RT_left']))
+        Dtypes = {x:merge_dtype(Dtypes.get(x),y) for x,y in chunk.dtypes.items()}
+        for TG,rows in chunk.groupby('TG',sort=False):
+            if TG not in Partitions:
+                Partitions[TG] = os.path.join(tmp_dir,'TG_%d.pkl' %len(Partitions))
+            with open(Partitions[TG],'ab') as f: #One pickled data frame per chunk
+                pickle.dump(rows,f)
+            Sizes[TG] = Sizes.get(TG,0) + len(rows)
+    return Partitions,Sizes,Dtypes
+
+def read_partitions(paths,Dtypes): #Rows of the given partition files, with the column types of the whole file and retention time ranges
+    Chunks = []
+    for path in paths:
+        with open(path,'rb') as f:
+            while True:
+                try:
+                    Chunks.append(pickle.load(f))
+                except EOFError:
+                    break
+    rdf = pd.concat(Chunks,ignore_index=True)
+    for x,y in Dtypes.items():
+        if not pd.api.types.is_numeric_dtype(y): #Numbers in a text column are read as text by the standard run (chunks may hold only numbers)
+            rdf[x] = rdf[x].map(str,na_action='ignore').astype(y)
+        elif rdf[x].dtype != y:
+            rdf[x] = rdf[x].astype(y)
+    rdf['Time_dif'] = rdf['RT_right'] - rdf['RT_left'] #As engine.read_input
+    return rdf
+
+def TG_batches(Partitions,Sizes,chunksize): #Join consecutive TG groups, in the order of the result table (brutto level), into batches of at most chunksize rows. Larger TG groups form a batch of their own
+    Batches,Batch,n = [],[],0
+    for TG in sorted(Partitions,key=lambda x: 'TG(' + x + ')'): #Results are sorted by brutto level first, so TG groups are written in that order
+        if len(Batch) and n + Sizes[TG] > chunksize:
+            Batches.append(Batch)
+            Batch,n = [],0
+        Batch.append(TG)
+        n += Sizes[TG]
+    return Batches + [Batch] if len(Batch) else Batches
+
+def stream_identify(path,FA_input,results_path,chunksize=100000,tmp_dir=None,Cache=None,Run=None): #Run the TAILOR-MS Identifier on batches of brutto TGs and append the results. Returns the number of result rows
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        with report.stage(Run,'partition_input'):
+            Partitions,Sizes,Dtypes = partition_input(path,tmp,chunksize)
+        pd.DataFrame(columns=['Identification/Prediction'] + engine.Result_columns).rename_axis('No.').to_csv(results_path) #Header only
+        n = 0
+        for Batch in TG_batches(Partitions,Sizes,chunksize):
+            t0 = time.perf_counter()
+            with report.stage(Run,'read_input'):
+                rdf = read_partitions([Partitions[TG] for TG in Batch],Dtypes)
+            with report.stage(Run,'cal_rel_abu'):
+                rdf2 = engine.cal_rel_abu(rdf)
+            with report.stage(Run,'candidates'):
+                rFA_df_SU = engine.Three_FA(rdf2,FA_input,report.counters(Run)) if Cache is None else cache.cached_candidates(rdf2,FA_input,Cache,Counters=report.counters(Run))
+            with report.stage(Run,'overlap_table'):
+                Peaks,Comb = engine.overlap_table(rdf2,rFA_df_SU)
+            with report.stage(Run,'thresholds'):
+                FA_struct = engine.apply_thresholds(Peaks,rFA_df_SU,Comb,report.counters(Run))
+            with report.stage(Run,'format_results'):
+                Results = engine.format_results(FA_struct)
+                Results.index = pd.RangeIndex(n+1,n+len(Results)+1,name='No.')
+            with report.stage(Run,'write'):
+                Results.to_csv(results_path,mode='a',header=False)
+            n += len(Results)
+            report.count(Run,input_rows=len(rdf),zero_abundance_rows=len(rdf)-len(rdf2),identified_rows=(Results['Identification/Prediction'] == 'I').sum(),predicted_rows=(Results['Identification/Prediction'] == 'P').sum())
+            report.TG_work(Run,rdf2,rFA_df_SU,FA_struct,time.perf_counter()-t0 if len(Batch) == 1 else None) #Time of a TG only when it forms a batch of its own
+    return n
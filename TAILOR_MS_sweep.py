@@ -0,0 +1,61 @@
+#TriAcylglycerol Identifier for Low Resolution Mass Spectrometers (TAILOR-MS) threshold sweep
+#Evaluates a grid of Abundance_threshold(%) and RT_tolerance(%) values without re-running the identification for every setting.
+#The overlap table (overlapping peak combinations, FA of least abundance, its relative abundance and the overlap as % of its RT range) is computed once.
+#Each grid point only compares these values to the thresholds. The grid values replace the per-row thresholds of the input data.
+import numpy as np
+import pandas as pd
+import TAILOR_MS_engine as engine
+
+def parse_grid(x): #Grid values as a comma separated list (eg 0,5,10) or start:stop:step with stop included (eg 50:95:5). Raises ValueError for invalid or empty grids
+    if ':' in x:
+        if x.count(':') != 2:
+            raise ValueError('invalid grid %s, expected start:stop:step' %x)
+        start,stop,step = [float(y) for y in x.split(':')]
+        if not step > 0:
+            raise ValueError('invalid grid %s, the step must be positive' %x)
+        Grid = np.round(np.arange(start,stop+step/2,step),10)
+    else:
+        Grid = np.array([float(y) for y in x.split(',')])
+    if len(Grid) == 0:
+        raise ValueError('empty grid %s, stop must not be below start' %x)
+    return Grid
+
+def threshold_sweep(rdf2,rFA_df_SU,Abundance_threshold,RT_tolerance): #Returns the identified/predicted counts for each grid point and the result table of each grid point (long format)
+    Peaks,Comb = engine.overlap_table(rdf2,rFA_df_SU)
+    Abundance_threshold,RT_tolerance = np.unique(Abundance_threshold),np.unique(RT_tolerance)
+    #A combination passes every threshold below its value (tests are strict), so its pass region is given by the number of grid values below its relative abundance and overlap
+    n_abu = np.searchsorted(Abundance_threshold,Comb['Rel_abundance(%)'],side='left')
+    n_RT = np.searchsorted(RT_tolerance,Comb['Overlap(%)'],side='left')
+
+    #Result rows of every combination that passes at least one grid point, labelled and sorted once
+    Sorted = engine.sort_results(engine.structural_outcome(Peaks,rFA_df_SU,engine.select_combinations(Comb,(n_abu>0) & (n_RT>0))))
+    Position = np.flatnonzero((n_abu>0) & (n_RT>0))[Sorted.index.to_numpy(dtype='int64')] #Position of each sorted row in the overlap table
+    n_abu,n_RT = n_abu[Position],n_RT[Position]
+    Prediction = (Sorted['Identification/Prediction'] == 'P').to_numpy()
+    All_results = engine.number_results(Sorted)
+
+    #Number of passing combinations on the grid: reverse cumulative sum of the 2D histogram of the pass regions
+    Counts = {}
+    for x,y in [('Identified',~Prediction),('Predicted',Prediction)]:
+        Hist = np.zeros((len(Abundance_threshold)+1,len(RT_tolerance)+1),dtype='int64')
+        np.add.at(Hist,(n_abu[y],n_RT[y]),1)
+        Counts[x] = Hist[::-1,::-1].cumsum(axis=0).cumsum(axis=1)[::-1,::-1][1:,1:]
+
+    Structure = pd.factorize(All_results['TG Structure'])[0]
+    Summary,Rows,Grid = [],[],[]
+    for i,x in enumerate(Abundance_threshold):
+        for j,y in enumerate(RT_tolerance):
+            Passed = np.flatnonzero((n_abu>i) & (n_RT>j))
+            Summary.append({'Abundance_threshold(%)':x,'RT_tolerance(%)':y,'Identified':Counts['Identified'][i,j],'Predicted':Counts['Predicted'][i,j],
+                            'Identified structures':len(np.unique(Structure[Passed[~Prediction[Passed]]])),
+                            'Predicted structures':len(np.unique(Structure[Passed[Prediction[Passed]]]))})
+            Rows.append(Passed)
+            Grid.append((x,y,len(Passed)))
+
+    #Result tables of all grid points in long format, numbered per grid point
+    Results = All_results.iloc[np.concatenate(Rows)].reset_index(drop=True)
+    n = np.array([x[2] for x in Grid],dtype='int64')
+    Results.insert(0,'No.',np.arange(n.sum()) - np.repeat(np.cumsum(n)-n,n) + 1)
+    Results.insert(0,'RT_tolerance(%)',np.repeat([x[1] for x in Grid],n))
+    Results.insert(0,'Abundance_threshold(%)',np.repeat([x[0] for x in Grid],n))
+    return pd.DataFrame(Summary),Results
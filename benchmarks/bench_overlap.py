@@ -0,0 +1,46 @@
+#Benchmark of the retention time interval index used to find overlapping FA1, FA2 and FA3 NL peaks (TAILOR_MS_engine.peak_combinations)
+#A single TG structure is built with three NL traces, each split into n peaks. Two layouts are timed:
+#  split:    each trace is cut into n consecutive peaks over the same RT range, so the number of overlapping peak triples grows linearly with n
+#  coeluted: all peaks of each trace share one RT window, so every triple overlaps (worst case, n^3 overlaps)
+#The run time of the split layout follows the number of overlaps, not the n^3 size of the full peak combination list.
+#Usage: python benchmarks/bench_overlap.py
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+import TAILOR_MS_engine as engine
+import TAILOR_MS_FA as FA_codes
+
+def NL_traces(n,layout): #NL peak table (as after engine.cal_rel_abu) for TG 48x0 with three FA traces (14x0, 16x0 and 18x0), each split into n peaks
+    rows = []
+    for FA,shift in [('14x0',0.0),('16x0',0.1),('18x0',0.2)]:
+        for i in range(n):
+            if layout == 'split':
+                RT_left,RT_right = 10 + shift + 10*i/n,10 + shift + 10*(i+1)/n
+            else:
+                RT_left,RT_right = 10 + shift,20 + shift
+            rows.append(['TG(48x0)_' + FA,'48x0',FA,'p%d' %i,RT_left,RT_right,1000 + i,0,75])
+    rdf = pd.DataFrame(rows,columns=['Name','TG','FA','Peak','RT_left','RT_right','Intensity','Abundance_threshold(%)','RT_tolerance(%)'])
+    rdf['Time_dif'] = rdf['RT_right'] - rdf['RT_left']
+    return engine.cal_rel_abu(rdf)
+
+def bench(n,layout,repeat=3):
+    rdf2 = NL_traces(n,layout)
+    rFA_df_SU = engine.Three_FA(rdf2,pd.DataFrame({'Fatty_acid':['14x0','16x0','18x0']}))
+    rFA_df_SU = rFA_df_SU.loc[rFA_df_SU.index == FA_codes.structure_key(*[FA_codes.encode([x]) for x in ['14x0','16x0','18x0']])[0]]
+    Peaks = engine.encode_peaks(rdf2)
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        struct = engine.peak_combinations(Peaks,rFA_df_SU)[0]
+        best = min(best,time.perf_counter()-t0)
+    return len(struct),best
+
+if __name__ == '__main__':
+    print('%-9s %7s %15s %12s %12s' %('layout','peaks','peaks^3','overlaps','time (ms)'))
+    for layout,sizes in [('split',[10,100,1000,10000]),('coeluted',[10,25,50,100,200])]:
+        for n in sizes:
+            n_overlap,t = bench(n,layout)
+            print('%-9s %7d %15d %12d %12.2f' %(layout,n,n**3,n_overlap,t*1000))
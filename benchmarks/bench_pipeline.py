@@ -0,0 +1,129 @@
+#Benchmark of every pipeline stage of the TAILOR-MS Identifier and MRM generator on synthetic workloads (benchmarks/workload.py)
+#Each sweep scales one workload parameter from a base setting. For every point, each stage is timed (best of --repeat runs) and its peak traced memory is recorded (one extra run under tracemalloc).
+#The local scaling exponent of the total run time against the workload size (input rows for the Identifier, TG structures for the MRM generator) is about 1 while the run time scales linearly.
+#The first size where it exceeds --nonlinear is reported for each sweep. All results are written to a JSON file to track regressions.
+#Usage: python benchmarks/bench_pipeline.py [--quick] [--sweep identifier-tg ...] [--repeat 3] [--output bench_pipeline.json]
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+Root = os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir)
+sys.path.insert(0,Root)
+sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+import TAILOR_MS_engine as engine
+import workload
+
+spec = importlib.util.spec_from_file_location('MRM_generator',os.path.join(Root,'TAILOR-MS_MRM_generator.py'))
+MRM_generator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(MRM_generator)
+
+Base = {'n_TG':100,'FA_per_TG':4,'peaks_per_trace':2,'overlap':0.5,'library_size':30}
+Sweeps = { #Sweep name: (script, workload parameter, values, quick values, changes to the base setting)
+    'identifier-tg':('identifier','n_TG',[50,100,200,400,800,1200],[50,200,800],{'library_size':200}), #About 1500 distinct brutto TGs can be built from 200 FAs
+    'identifier-peaks':('identifier','peaks_per_trace',[1,2,4,8,16,32],[1,4,16],{}),
+    'identifier-fa':('identifier','FA_per_TG',[3,4,6,8,12],[3,6,12],{}),
+    'identifier-overlap':('identifier','overlap',[0,0.25,0.5,0.75,1],[0,0.5,1],{}),
+    'identifier-library':('identifier','library_size',[30,60,120,200],[30,120],{}),
+    'mrm-library':('mrm','library_size',[10,20,40,80,120,160,200],[10,40,120],{'n_TG':1}), #Only the FA list is used
+}
+
+def identifier_stages(paths): #Stages of the TAILOR-MS Identifier, each a function of the outputs of the previous stage
+    FA_input = pd.read_csv(paths['FA'])
+    return [('read_input',lambda x: engine.read_input(paths['Input'])),
+            ('check_input',lambda x: (engine.check_input(x),x)[1]),
+            ('cal_rel_abu',lambda x: engine.cal_rel_abu(x)),
+            ('candidates',lambda x: (x,engine.Three_FA(x,FA_input))),
+            ('overlap_table',lambda x: (x[1],)+engine.overlap_table(*x)),
+            ('thresholds',lambda x: engine.apply_thresholds(x[1],x[0],x[2])),
+            ('format_results',lambda x: engine.format_results(x)),
+            ('write',lambda x: x.to_csv(paths['Results']))]
+
+def MRM_stages(paths): #Stages of the MRM generator
+    return [('read_input',lambda x: pd.read_csv(paths['FA_MRM'])),
+            ('TG_combinations',lambda x: (x,MRM_generator.TG_combinations(x))),
+            ('MRM_masses',lambda x: x + MRM_generator.MRM_masses(x[0],*x[1])),
+            ('TG_summary',lambda x: x + (MRM_generator.TG_summary(x[0],x[2],*x[1]),)),
+            ('MRM_list',lambda x: x + (MRM_generator.MRM_list(x[0],x[2],*x[1],x[3],x[4]),)),
+            ('write',lambda x: (x[5].to_csv(paths['TG_by_MRM']),x[6].to_csv(paths['MRM_list'])))]
+
+def run_stages(Stages,memory=False): #Run the stages once. Returns the time (s) or the peak traced memory (bytes) of each stage
+    Out,x = [],None
+    for name,f in Stages:
+        if memory:
+            tracemalloc.reset_peak()
+            x = f(x)
+            Out.append(tracemalloc.get_traced_memory()[1])
+        else:
+            t0 = time.perf_counter()
+            x = f(x)
+            Out.append(time.perf_counter() - t0)
+    return Out,x
+
+def bench(script,params,repeat=3,seed=0): #Time and memory of each stage of one script on one synthetic workload
+    with tempfile.TemporaryDirectory() as tmp:
+        Input,FA_input,FA_MRM = workload.write_workload(tmp,seed=seed,**params)
+        paths = {x:os.path.join(tmp,x + '.csv') for x in ['Input','FA','FA_MRM','Results','TG_by_MRM','MRM_list']}
+        Stages = identifier_stages(paths) if script == 'identifier' else MRM_stages(paths)
+        Times = np.min([run_stages(Stages)[0] for _ in range(repeat)],axis=0)
+        tracemalloc.start()
+        try:
+            Memory = run_stages(Stages,memory=True)[0]
+        finally:
+            tracemalloc.stop()
+        if script == 'identifier':
+            size = len(Input)
+            n_out = len(pd.read_csv(paths['Results']))
+        else:
+            size = len(pd.read_csv(paths['TG_by_MRM']))
+            n_out = len(pd.read_csv(paths['MRM_list']))
+    return {'size':size,'outputs':n_out,'total_seconds':float(Times.sum()),'peak_MB':max(Memory)/2**20,
+            'stages':[{'stage':x[0],'seconds':float(t),'peak_MB':m/2**20} for x,t,m in zip(Stages,Times,Memory)]}
+
+def scaling(Runs): #Local exponent of the total run time against the workload size, between consecutive points of a sweep
+    for x,y in zip(Runs[:-1],Runs[1:]):
+        if 'error' not in x and 'error' not in y and y['size'] > 1.1*x['size'] > 0: #Sweeps that do not change the size much (eg FA library size for the Identifier) have no exponent
+            y['scaling'] = float(np.log(y['total_seconds']/x['total_seconds'])/np.log(y['size']/x['size']))
+    return Runs
+
+parser = argparse.ArgumentParser(description='Time every pipeline stage of the TAILOR-MS scripts on synthetic workloads.')
+parser.add_argument('--sweep',nargs='+',choices=list(Sweeps),default=list(Sweeps),help='Sweeps to run (default all)')
+parser.add_argument('--quick',action='store_true',help='Fewer, smaller points per sweep')
+parser.add_argument('--repeat',type=int,default=3,help='Timed runs per point (the fastest is kept)')
+parser.add_argument('--seed',type=int,default=0,help='Seed of the synthetic workloads')
+parser.add_argument('--nonlinear',type=float,default=1.25,help='Scaling exponent above which the run time is reported as non-linear')
+parser.add_argument('--output',default='bench_pipeline.json',help='JSON results file')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    Report = {'environment':{'python':platform.python_version(),'numpy':np.__version__,'pandas':pd.__version__,'platform':platform.platform()},
+              'base':Base,'repeat':args.repeat,'seed':args.seed,'sweeps':{}}
+    print('%-20s %8s %9s %9s %10s %9s %8s' %('sweep','value','size','outputs','time (s)','peak MB','scaling'))
+    for name in args.sweep:
+        script,parameter,values,quick,changes = Sweeps[name]
+        Runs = []
+        for value in (quick if args.quick else values):
+            params = dict(Base,**changes)
+            params[parameter] = value
+            try:
+                run = bench(script,params,args.repeat,args.seed)
+            except ValueError as e: #Workload cannot be built (eg too few distinct brutto TGs for the FA library)
+                run = {'error':str(e)}
+            Runs.append(dict({'value':value,'workload':params},**run))
+        Runs = scaling(Runs)
+        for x in Runs:
+            if 'error' in x:
+                print('%-20s %8s  %s' %(name,x['value'],x['error']))
+            else:
+                print('%-20s %8s %9d %9d %10.4f %9.1f %8s' %(name,x['value'],x['size'],x['outputs'],x['total_seconds'],x['peak_MB'],'%.2f' %x['scaling'] if 'scaling' in x else '-'))
+        Nonlinear = [x['size'] for x in Runs if x.get('scaling',0) > args.nonlinear]
+        Report['sweeps'][name] = {'script':script,'parameter':parameter,'nonlinear_from':Nonlinear[0] if Nonlinear else None,'runs':Runs}
+    with open(args.output,'w') as f:
+        json.dump(Report,f,indent=1)
+    print('Results written to ' + args.output)
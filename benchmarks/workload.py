@@ -0,0 +1,106 @@
+#Synthetic TAILOR-MS workloads: reproducible Input.csv, FA.csv and FA_MRM.csv files of any size
+#The FA library holds the most common FAs first (chain length close to 16-18 carbons, few double bonds).
+#Each brutto TG is the sum of one true TG structure. Its other detected FAs come in pairs that give another structure of the same brutto TG, so the identification has isomers to resolve.
+#Every FA trace is cut into consecutive NL peaks. The RT overlap density sets how far the traces of a TG are shifted against each other (1: all traces start together, 0: shifts up to a full trace length).
+#Usage: python benchmarks/workload.py --tg 200 --fa-per-tg 6 --peaks 3 --overlap 0.5 --library 40 --seed 1 --output <dir>
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+import TAILOR_MS_FA as FA_codes
+
+Peak_width = 0.3 #Mean NL peak width (min)
+RT_range = (2.0,30.0) #Elution window of the brutto TGs (min)
+
+def FA_library(n): #Codes of the n most common FAs (C 2-36, DB 0-6), sorted by carbon chain length and double bond number
+    C,DB = np.meshgrid(np.arange(2,37),np.arange(0,7),indexing='ij')
+    C,DB = C.ravel(),DB.ravel()
+    Keep = DB <= C//2 - 1
+    C,DB = C[Keep],DB[Keep]
+    if n > len(C):
+        raise ValueError('FA library size must be at most %d' %len(C))
+    Order = np.lexsort((C,np.abs(C-17) + 3*DB + 2*(C % 2))) #Even chains close to C17 with few double bonds first
+    return np.sort(FA_codes.pack(C[Order[:n]],DB[Order[:n]]))
+
+def brutto_FAs(rng,Library,FA_per_TG): #Brutto TG code and detected FA codes of one TG: a true structure, completed with pairs of FAs giving other structures of the same brutto TG
+    FA = list(rng.choice(Library,3))
+    TG = sum(FA)
+    In_library = set(Library.tolist())
+    for _ in range(20*FA_per_TG):
+        if len(set(FA)) >= FA_per_TG:
+            break
+        x,y = rng.choice(Library),rng.choice(FA) #FA x replaces two FAs with x and z, keeping y
+        z = TG - x - y
+        if z in In_library:
+            FA += [x,z]
+    FA = list(dict.fromkeys(FA))[:max(FA_per_TG,3)]
+    return TG,FA
+
+def peak_labels(n): #a, b, ..., z, aa, ab, ...
+    Labels = []
+    for i in range(n):
+        x = ''
+        i += 1
+        while i > 0:
+            i,r = divmod(i-1,26)
+            x = chr(97+r) + x
+        Labels.append(x)
+    return Labels
+
+def make_workload(n_TG,FA_per_TG=4,peaks_per_trace=2,overlap=0.5,library_size=30,seed=0,abundance_threshold=0,RT_tolerance=75): #Returns Input (as Input.csv), FA list (as FA.csv) and FA list for the MRM generator (as FA_MRM.csv)
+    rng = np.random.default_rng(seed)
+    Library = FA_library(library_size)
+    TGs = {}
+    for _ in range(50*n_TG): #Distinct brutto TGs
+        if len(TGs) >= n_TG:
+            break
+        TG,FA = brutto_FAs(rng,Library,FA_per_TG)
+        TGs.setdefault(TG,FA)
+    if len(TGs) < n_TG:
+        raise ValueError('Only %d distinct brutto TGs can be built from a library of %d FAs' %(len(TGs),library_size))
+
+    Labels = peak_labels(peaks_per_trace)
+    TG_code,FA_code,Peak,RT_left,RT_right = [],[],[],[],[]
+    for TG,FA in TGs.items():
+        Start = rng.uniform(*RT_range)
+        for x in FA:
+            Width = rng.uniform(0.5,1.5,peaks_per_trace)*Peak_width
+            Edges = Start + (1-overlap)*rng.uniform(0,Width.sum()) + np.concatenate([[0],np.cumsum(Width)])
+            TG_code += [TG]*peaks_per_trace
+            FA_code += [x]*peaks_per_trace
+            Peak += Labels
+            RT_left.append(Edges[:-1])
+            RT_right.append(Edges[1:])
+
+    TG_str,FA_str = FA_codes.decode(TG_code),FA_codes.decode(FA_code)
+    Input = pd.DataFrame({'Name':'TG(' + pd.Series(TG_str) + ')_' + pd.Series(FA_str),'TG':TG_str,'FA':FA_str,'Peak':Peak,
+                          'RT_left':np.round(np.concatenate(RT_left),5),'RT_right':np.round(np.concatenate(RT_right),5),
+                          'Intensity':np.round(rng.lognormal(16,1.5,len(Peak))).astype('int64') + 1,
+                          'Abundance_threshold(%)':abundance_threshold,'RT_tolerance(%)':RT_tolerance})
+    FA_input = pd.DataFrame({'Fatty_acid':FA_codes.decode(Library)})
+    FA_MRM = FA_input.assign(Reappearance=np.where(FA_codes.double_bond(Library) <= 1,'Y','N')) #Saturated and monounsaturated FAs may appear more than once
+    return Input,FA_input,FA_MRM
+
+def write_workload(output_dir,*args,**kwargs): #Write Input.csv, FA.csv and FA_MRM.csv of a synthetic workload
+    os.makedirs(output_dir,exist_ok=True)
+    Input,FA_input,FA_MRM = make_workload(*args,**kwargs)
+    Input.to_csv(os.path.join(output_dir,'Input.csv'),index=False)
+    FA_input.to_csv(os.path.join(output_dir,'FA.csv'),index=False)
+    FA_MRM.to_csv(os.path.join(output_dir,'FA_MRM.csv'),index=False)
+    return Input,FA_input,FA_MRM
+
+parser = argparse.ArgumentParser(description='Write a synthetic TAILOR-MS workload (Input.csv, FA.csv, FA_MRM.csv).')
+parser.add_argument('--tg',type=int,default=100,help='Number of brutto TGs')
+parser.add_argument('--fa-per-tg',type=int,default=4,help='Detected FAs per brutto TG (at least 3)')
+parser.add_argument('--peaks',type=int,default=2,help='NL peaks per FA trace')
+parser.add_argument('--overlap',type=float,default=0.5,help='RT overlap density of the FA traces of a TG, from 0 to 1')
+parser.add_argument('--library',type=int,default=30,help='FA library size (FA.csv, FA_MRM.csv)')
+parser.add_argument('--seed',type=int,default=0)
+parser.add_argument('--output',default='.',help='Output directory')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    Input = write_workload(args.output,args.tg,args.fa_per_tg,args.peaks,args.overlap,args.library,args.seed)[0]
+    print('%d rows, %d brutto TGs written to %s' %(len(Input),Input['TG'].nunique(),args.output))